@@ -1,8 +1,20 @@
 # app.py
 import os
+import atexit
+import functools
 import logging
-from flask import Flask, jsonify
-from datetime import datetime
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import msgspec
+import orjson
+from flask import Blueprint, Flask, Response, current_app
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+from flask.logging import default_handler
+from flask_compress import Compress
+from datetime import datetime, timezone
 
 # --- Configuration ---
 # Use environment variables for configuration. This is a best practice for Docker
@@ -13,45 +25,235 @@ DEBUG_MODE = FLASK_ENV == 'development'
 SECRET_KEY = os.environ.get('SECRET_KEY', 'a_super_secret_key_for_dev_only') # IMPORTANT: Change this for production!
 APP_VERSION = os.environ.get('APP_VERSION', '0.0.1-dev') # Set by CI/CD pipeline, e.g., git SHA
 
+# Responses that never change for the lifetime of the process are built once here
+# instead of on every request. Returning the same Response instance is safe: Werkzeug
+# copies the headers when sending it, and per-request headers such as Date are added
+# by the WSGI server at send time. Vary: Accept-Encoding is set up front because
+# Flask-Compress adds it to every response otherwise; with it already present, that
+# after_request hook leaves these shared instances untouched.
+_HELLO_BODY = f'Hello, Flask in Docker! This is version: {APP_VERSION}'
+_HELLO_RESPONSE = Response(_HELLO_BODY, status=200, mimetype='text/plain',
+                           headers={'Vary': 'Accept-Encoding'})
+_OK_RESPONSE = Response(b'OK', status=200, mimetype='text/plain', # Body given as bytes; no encode step
+                        headers={'Vary': 'Accept-Encoding'})
+
 # --- Logging Setup ---
 # Configure logging for production. Flask's default debug logging is not suitable.
 # Log to stdout/stderr so Docker can pick it up, and a logging agent can forward it.
-logging.basicConfig(level=logging.INFO if not DEBUG_MODE else logging.DEBUG,
-                    format='[%(asctime)s] %(levelname)s in %(module)s: %(message)s')
+# Request handlers only enqueue records; a background QueueListener thread does the
+# formatting and the actual write to stderr, keeping blocking I/O off the request path.
+# The listener writes through a MemoryHandler so records reach stderr in batches of
+# LOG_BUFFER; ERROR and above are written immediately. The queue holds at most
+# LOG_QUEUE_MAX records; beyond that, new records are dropped.
+LOG_LEVEL = logging.INFO if not DEBUG_MODE else logging.DEBUG
+# No %(asctime)s: Docker and log agents (fluentd, journald, ...) timestamp each line on
+# ingest, so formatting the time here would only add a strftime call per record.
+LOG_FORMAT = '%(levelname)s in %(module)s: %(message)s'
+LOG_BUFFER = int(os.environ.get('LOG_BUFFER', '100')) # Records held before a batched write
+LOG_FLUSH_INTERVAL = 0.25 # Seconds; bounds how long a record can sit in the buffer
+LOG_QUEUE_MAX = int(os.environ.get('LOG_QUEUE_MAX', '10000')) # Records waiting for the listener
+LOG_SHUTDOWN_TIMEOUT = 2 # Seconds to wait for queued records to be written on shutdown
+
+class _StderrHandler(logging.StreamHandler):
+    """
+    StreamHandler that looks up sys.stderr at write time rather than at setup time,
+    since buffered records can be written long after the handler was created.
+    """
+    @property
+    def stream(self):
+        return sys.stderr
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops the record when the queue is full, so a stalled log sink
+    costs log lines instead of memory or request latency.
+    """
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass # Drop rather than block or grow without bound
+
+class _BoundedQueueListener(logging.handlers.QueueListener):
+    """
+    QueueListener whose shutdown waits at most LOG_SHUTDOWN_TIMEOUT seconds for the
+    listener to drain. The stock put_nowait() would raise queue.Full if the bounded queue
+    is full at exit, and the stock join() would never return if the log sink has stalled.
+    """
+    def enqueue_sentinel(self):
+        try:
+            self.queue.put(self._sentinel, timeout=LOG_SHUTDOWN_TIMEOUT)
+        except queue.Full:
+            pass # Sink stalled; stop() gives up on the listener below
+
+    def stop(self):
+        """
+        Stops the listener, giving up after LOG_SHUTDOWN_TIMEOUT.
+        Returns True if the listener thread finished draining the queue.
+        """
+        self.enqueue_sentinel()
+        self._thread.join(LOG_SHUTDOWN_TIMEOUT)
+        stopped = not self._thread.is_alive()
+        self._thread = None
+        return stopped
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_MAX)
+_queue_handler = _NonBlockingQueueHandler(_log_queue)
+_stream_handler = _StderrHandler()
+_stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+_buffer_handler = logging.handlers.MemoryHandler(capacity=LOG_BUFFER,
+                                                 flushLevel=logging.ERROR,
+                                                 target=_stream_handler,
+                                                 flushOnClose=True)
+_log_listener = _BoundedQueueListener(_log_queue, _buffer_handler, respect_handler_level=True)
+
+_log_flush_stop = threading.Event()
+
+def _flush_log_buffer():
+    """
+    Periodically flushes the log buffer so records still show up promptly
+    during low-traffic periods, when the buffer would otherwise take a long time to fill.
+    Runs in a single daemon thread until _log_flush_stop is set.
+    """
+    while not _log_flush_stop.wait(LOG_FLUSH_INTERVAL):
+        _buffer_handler.flush()
+
+def _stop_logging():
+    """
+    Drains queued records and writes out whatever is left in the buffer on shutdown.
+    """
+    _log_flush_stop.set()
+    if _log_listener.stop():
+        _buffer_handler.close()
+    else:
+        # The listener is still blocked writing to a stalled sink and holds the handler
+        # locks. Closing the buffer, or logging.shutdown() (which atexit runs after this),
+        # would block forever acquiring them, so skip both and let the process exit.
+        atexit.unregister(logging.shutdown)
+
+atexit.register(_stop_logging)
+
+# --- JSON Provider ---
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider backed by orjson, so jsonify(), request.get_json() and
+    Response.get_json() all use its C encoder/decoder instead of the stdlib json module.
+
+    Like Flask's DefaultJSONProvider, it sorts keys, stringifies non-str dict keys,
+    and encodes dates as HTTP dates and Decimal, UUID and __html__ objects as strings.
+    Differences from DefaultJSONProvider on the orjson path:
+    - non-ASCII text is written as UTF-8 rather than \\u escapes;
+    - output is compact, and indentation is always 2 spaces;
+    - integers outside the 64-bit range raise TypeError, and NaN/Infinity encode as null.
+    Calls with arguments orjson can't honour (e.g. ensure_ascii, a non-compact separators
+    or other indent, or loads(object_hook=...) as used by Flask's session cookie)
+    are handed to DefaultJSONProvider rather than having those arguments ignored.
+    """
+    sort_keys = True
 
-app = Flask(__name__)
-app.config.from_mapping(
-    SECRET_KEY=SECRET_KEY,
-    ENV=FLASK_ENV,
-    DEBUG=DEBUG_MODE,
-    # Add other configurations as needed, e.g., database URI, external service URLs
-)
+    def __init__(self, app):
+        super().__init__(app)
+        self._stdlib = DefaultJSONProvider(app)
+
+    def dumps(self, obj, **kwargs):
+        default = kwargs.pop('default', None) or DefaultJSONProvider.default
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        indent = kwargs.pop('indent', None)
+        separators = kwargs.pop('separators', None)
+        if kwargs or indent not in (None, 0, 2) or separators not in (None, (',', ':')):
+            return self._stdlib.dumps(obj, default=default, sort_keys=sort_keys, indent=indent,
+                                      separators=separators, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        # DefaultJSONProvider.default is Flask's fallback for dates, Decimal, UUID,
+        # dataclasses and __html__ objects; the datetime passthrough routes dates to it.
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return self._stdlib.loads(s, **kwargs)
+        return orjson.loads(s)
+
+# --- Response Compression ---
+# Compresses JSON responses for clients that send Accept-Encoding. Limited to JSON on
+# purpose: / and /status return shared pre-built Responses, and Flask-Compress rewrites
+# the body and headers of the response it compresses in place. Those Responses also
+# carry their own Vary header, because Flask-Compress writes Vary on every response
+# before it checks the mimetype.
+# Note: with COMPRESS_MIN_SIZE at 200 bytes, nothing in this app is compressed today;
+# the default /health body is only about 130 bytes. The extension still runs an
+# after_request hook on every request; it only starts paying off once /health carries
+# real dependency checks (or other JSON endpoints are added).
+compress = Compress()
+
+# --- Background Threads ---
+def start_background_threads():
+    """
+    Starts the log listener and the log buffer flush timer.
+    Threads do not survive fork(), so Gunicorn calls this again in every worker
+    (see post_fork in gunicorn.conf.py) when the app is preloaded in the master.
+    """
+    global _log_queue, _log_flush_stop
+    # A queue or event inherited across fork() still lists the parent's (now dead) waiting
+    # thread, which would swallow the first notify, and may even have been copied with its
+    # mutex held. Give each process its own before starting its threads.
+    _log_queue = queue.Queue(maxsize=LOG_QUEUE_MAX)
+    _queue_handler.queue = _log_queue
+    _log_listener.queue = _log_queue
+    _log_flush_stop = threading.Event()
+
+    _log_listener.start()
+    threading.Thread(target=_flush_log_buffer, name='log-buffer-flush', daemon=True).start()
+
+start_background_threads()
 
 # --- Routes ---
+# Routes live on a blueprint and are registered on the app in one go by create_app().
+api = Blueprint('api', __name__)
 
-@app.route('/')
+@api.route('/')
 def hello_world():
     """
     Root endpoint: Basic greeting.
     """
-    app.logger.info("Accessing the root endpoint.")
-    return 'Hello, Flask in Docker! This is version: {}'.format(APP_VERSION)
+    if current_app.logger.isEnabledFor(logging.INFO):
+        current_app.logger.info("Accessing the root endpoint.")
+    return _HELLO_RESPONSE
 
-@app.route('/health')
-def health_check():
+# --- Health Payload ---
+class HealthStatus(msgspec.Struct):
     """
-    Comprehensive health check endpoint.
-    - Returns 200 OK if the application is fundamentally able to respond to requests.
-    - Can be extended to check database connections, external services, etc.
+    Shape of the /health response body. msgspec encodes a Struct from its fixed
+    schema, which is faster than encoding the equivalent dict.
+    """
+    status: str
+    timestamp: str
+    application_version: str
+    environment: str
+    checks: list = []
+
+_HEALTH_ENCODER = msgspec.json.Encoder()
+
+# The /health payload is rebuilt at most once per second of wall time, however many
+# probes arrive: the cache key is the current Unix second, so a new second is a cache miss.
+# maxsize leaves room for requests that straddle a second boundary on different threads.
+@functools.lru_cache(maxsize=4)
+def _health_payload(second_bucket):
+    """
+    Runs the health checks and returns the encoded /health body and status code
+    for the given Unix second.
     """
-    app.logger.debug("Received health check request.")
-    health_status = {
-        "status": "UP",
-        "timestamp": datetime.now().isoformat(),
-        "application_version": APP_VERSION,
-        "environment": FLASK_ENV,
-        "checks": []
-    }
+    health_status = HealthStatus(status="UP",
+                                 timestamp=datetime.fromtimestamp(second_bucket, timezone.utc).isoformat(),
+                                 application_version=APP_VERSION,
+                                 environment=FLASK_ENV)
 
     # --- Example of advanced health checks (uncomment and implement as needed) ---
 
@@ -64,13 +266,13 @@ def health_check():
     #         # conn.close()
     #         return True, "Database connection successful"
     #     except Exception as e:
-    #         app.logger.error(f"Database check failed: {e}")
+    #         current_app.logger.error(f"Database check failed: {e}")
     #         return False, f"Database connection failed: {str(e)}"
 
     # db_ok, db_message = check_database_connection()
-    # health_status["checks"].append({"name": "database", "status": "OK" if db_ok else "DOWN", "message": db_message})
+    # health_status.checks.append({"name": "database", "status": "OK" if db_ok else "DOWN", "message": db_message})
     # if not db_ok:
-    #     health_status["status"] = "DEGRADED" # Or "DOWN" based on criticality
+    #     health_status.status = "DEGRADED" # Or "DOWN" based on criticality
 
 
     # 2. External Service Check (Example: using a dummy function)
@@ -82,34 +284,75 @@ def health_check():
     #         # response.raise_for_status()
     #         return True, "External API reachable"
     #     except Exception as e:
-    #         app.logger.error(f"External API check failed: {e}")
+    #         current_app.logger.error(f"External API check failed: {e}")
     #         return False, f"External API unreachable: {str(e)}"
 
     # api_ok, api_message = check_external_api()
-    # health_status["checks"].append({"name": "external_api", "status": "OK" if api_ok else "DOWN", "message": api_message})
-    # if not api_ok and health_status["status"] == "UP": # Don't override if already DOWN from DB
-    #     health_status["status"] = "DEGRADED"
+    # health_status.checks.append({"name": "external_api", "status": "OK" if api_ok else "DOWN", "message": api_message})
+    # if not api_ok and health_status.status == "UP": # Don't override if already DOWN from DB
+    #     health_status.status = "DEGRADED"
 
     # --- End of example advanced checks ---
 
     status_code = 200
-    if health_status["status"] == "DOWN":
+    if health_status.status == "DOWN":
         status_code = 503 # Service Unavailable
-    elif health_status["status"] == "DEGRADED":
+    elif health_status.status == "DEGRADED":
         status_code = 200 # Still OK, but with warnings (for monitoring systems)
 
-    app.logger.debug(f"Health check response: {health_status['status']} with status code {status_code}")
-    return jsonify(health_status), status_code
+    return _HEALTH_ENCODER.encode(health_status), status_code
+
+@api.route('/health')
+def health_check():
+    """
+    Comprehensive health check endpoint.
+    - Returns 200 OK if the application is fundamentally able to respond to requests.
+    - Can be extended to check database connections, external services, etc. (see _health_payload).
+    """
+    # No per-request logging here or in /status: Gunicorn's access log (accesslog = '-')
+    # already records every request with its path, status and timing.
+    body, status_code = _health_payload(int(time.time()))
+    return current_app.response_class(body, status=status_code, mimetype='application/json')
 
 # Standard /status endpoint, often used for very basic liveness checks
-@app.route('/status')
+@api.route('/status')
 def status():
     """
     Simple status endpoint, primarily for liveness probes.
     Returns 200 OK if the Flask app process is running and able to serve requests.
+    In the recommended deployment the reverse proxy answers /status itself (see nginx.conf);
+    this route is the fallback when the proxy isn't configured that way.
+    """
+    return _OK_RESPONSE
+
+# --- Application Factory ---
+def create_app():
     """
-    app.logger.debug("Received status check request.")
-    return 'OK', 200
+    Builds and configures the Flask application.
+    """
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    app.config.from_mapping(
+        SECRET_KEY=SECRET_KEY,
+        ENV=FLASK_ENV,
+        DEBUG=DEBUG_MODE,
+        COMPRESS_MIMETYPES=['application/json'],
+        COMPRESS_MIN_SIZE=200, # Bytes; smaller bodies gain nothing from compression
+        # Add other configurations as needed, e.g., database URI, external service URLs
+    )
+    app.logger.removeHandler(default_handler) # Replaced by the queue handler below
+    app.logger.addHandler(_queue_handler)
+    app.logger.setLevel(LOG_LEVEL)
+
+    # Serve '/status/' the same as '/status' instead of a 404 or redirect; some health
+    # checkers append a trailing slash.
+    app.url_map.strict_slashes = False
+    app.register_blueprint(api)
+    compress.init_app(app)
+    return app
+
+# Module-level instance used by Gunicorn ('app:app') and by `python app.py`.
+app = create_app()
 
 # --- Production WSGI Server Execution ---
 # This block is crucial for a production-grade Flask application.
@@ -125,25 +368,6 @@ if __name__ == '__main__':
         # if you are using a proper WSGI server like Gunicorn as your ENTRYPOINT.
         # It's here as a fallback or for direct execution outside a WSGI server for testing.
         app.logger.info("Flask app configured for PRODUCTION. Please use a WSGI server (e.g., Gunicorn).")
-        # Example of how you *would* run with Gunicorn if this was the entrypoint,
-        # but typically Gunicorn is called directly from the Dockerfile's CMD/ENTRYPOINT.
-        # from gunicorn.app.base import BaseApplication
-        # class StandaloneApplication(BaseApplication):
-        #     def __init__(self, app, options=None):
-        #         self.application = app
-        #         self.options = options or {}
-        #         super().__init__()
-        #     def load_config(self):
-        #         for key, value in self.options.items():
-        #             self.cfg.set(key.lower(), value)
-        #     def load(self):
-        #         return self.application
-        # options = {
-        #     'bind': '%s:%s' % ('0.0.0.0', 5000),
-        #     'workers': os.environ.get('WEB_CONCURRENCY', 2), # Use WEB_CONCURRENCY from env
-        #     'timeout': os.environ.get('GUNICORN_TIMEOUT', 30),
-        #     'loglevel': 'info',
-        #     'errorlog': '-', # Log to stderr
-        #     'accesslog': '-', # Log to stdout
-        # }
-        # StandaloneApplication(app, options).run()
+        # Run the app with the bundled Gunicorn configuration instead (this is what the
+        # Dockerfile's CMD does):
+        #   gunicorn -c gunicorn.conf.py app:app
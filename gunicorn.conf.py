@@ -0,0 +1,65 @@
+# gunicorn.conf.py
+# Gunicorn configuration for running the app in production:
+#   gunicorn -c gunicorn.conf.py app:app
+# Every setting can be overridden through environment variables, so the same file works
+# for local runs, Docker and CI/CD deployments.
+import os
+import multiprocessing
+
+# --- Server Socket ---
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# --- Worker Processes ---
+# gthread workers suit these I/O-bound endpoints: each worker process serves
+# `threads` requests concurrently. (2 * CPU_CORES) + 1 is the usual worker heuristic.
+# CPU_CORES counts the cores this process may run on (its affinity mask / cpuset), not
+# every core on the host. It still can't see a cgroup CPU quota (e.g. a Kubernetes CPU
+# limit), so containers should set GUNICORN_WORKERS explicitly; the Dockerfile does.
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError: # Not available on macOS/Windows
+        return multiprocessing.cpu_count()
+
+workers = int(os.environ.get('GUNICORN_WORKERS', (2 * _available_cpus()) + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+# Keep idle connections open between requests so repeated probes from the same load
+# balancer or kubelet reuse one TCP connection. Longer than typical load balancer idle
+# timeouts (e.g. ALB's 60 s) so the balancer, not Gunicorn, closes idle connections.
+keepalive = 65 # Seconds
+# Recycle workers periodically to contain memory growth; the jitter keeps them from
+# all restarting at the same time.
+max_requests = 2048
+max_requests_jitter = 512
+
+# --- Application Loading ---
+# Import the app once in the master so workers fork with it already loaded.
+preload_app = True
+
+# --- Logging ---
+accesslog = '-' # Log to stdout
+errorlog = '-' # Log to stderr
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+# --- Server Hooks ---
+def post_fork(server, worker):
+    """
+    With preload_app the app's background threads were started in the master and
+    did not survive the fork, so start them again inside each worker.
+    """
+    from app import start_background_threads
+    start_background_threads()
+
+
+def post_worker_init(worker):
+    """
+    Builds the /health payload once before the worker starts accepting connections,
+    so the worker's first encode happens here rather than on a request. The cached
+    entry is keyed on the current Unix second, so it only serves a probe in that second.
+    """
+    import time
+    from app import _health_payload
+    _health_payload(int(time.time()))
@@ -1,49 +1,57 @@
 # test_app.py
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 import pytest
-import json
-import os # Import os to manage environment variables for testing
-from app import app # Import the Flask app instance from app.py
 
-# --- Pytest Fixture for Test Client Setup ---
-@pytest.fixture
-def client():
+# --- Pytest Fixtures for Test Client Setup ---
+@pytest.fixture(scope='session')
+def _app_env():
+    """
+    Sets the environment variables the app reads at import time, once for the whole
+    test session. MonkeyPatch restores the original values when the session ends.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv('FLASK_ENV', 'testing')
+        mp.setenv('APP_VERSION', 'test-version-1.0.0') # Mock a version for testing
+        yield
+
+@pytest.fixture(scope='session')
+def client(_app_env):
     """
     Configures the Flask application for testing and provides a test client.
     Ensures the app runs in a controlled 'testing' environment.
+    The same client is shared by all tests in the session.
     """
-    # Create a copy of original environment variables to restore later
-    original_flask_env = os.environ.get('FLASK_ENV')
-    original_app_version = os.environ.get('APP_VERSION')
-
-    # Set environment variables specifically for testing
-    os.environ['FLASK_ENV'] = 'testing'
-    os.environ['APP_VERSION'] = 'test-version-1.0.0' # Mock a version for testing
+    # Import here, after _app_env has set the environment, because app.py reads its
+    # configuration (FLASK_ENV, APP_VERSION) at import time.
+    from app import create_app
+    app = create_app()
 
     # Configure the Flask app for testing
     # TESTING = True disables error catching during request handling,
     # so errors propagate to the test client.
-    app.config['TESTING'] = True
-    # Provide a dummy secret key for testing purposes, if your app uses it.
-    app.config['SECRET_KEY'] = 'test_secret_key'
-    # Ensure debug mode is off for testing, mimicking production behavior where possible.
-    app.config['DEBUG'] = False
+    # SECRET_KEY is a dummy key for testing purposes, if your app uses it.
+    # DEBUG = False mimics production behavior where possible.
+    app.config.update(TESTING=True, DEBUG=False, SECRET_KEY='test_secret_key')
 
     # Create a test client to make requests to the app
     # The 'with' statement ensures the client is properly closed after tests.
     with app.test_client() as client:
         yield client # Yield the test client to the tests
 
-    # --- Teardown: Clean up after tests ---
-    # Restore original environment variables to avoid side effects on other tests
-    if original_flask_env is not None:
-        os.environ['FLASK_ENV'] = original_flask_env
-    else:
-        del os.environ['FLASK_ENV'] # Remove if it wasn't set originally
-
-    if original_app_version is not None:
-        os.environ['APP_VERSION'] = original_app_version
-    else:
-        del os.environ['APP_VERSION'] # Remove if it wasn't set originally
+@pytest.fixture(scope='session', autouse=True)
+def _shared_response_headers(_app_env):
+    """
+    Snapshots the headers of the app's shared pre-built Responses before any test
+    sends a request, so tests can check that serving them never modifies them.
+    """
+    import app as app_module
+    shared = (app_module._HELLO_RESPONSE, app_module._OK_RESPONSE)
+    return [(response, list(response.headers)) for response in shared]
 
 
 # --- Test Cases ---
@@ -57,7 +65,7 @@ def test_hello_world(client):
     assert rv.status_code == 200 # Assert HTTP 200 OK
     # Assert that the response data contains the expected byte string including the mocked version
     assert b'Hello, Flask in Docker! This is version: test-version-1.0.0' in rv.data
-    assert rv.mimetype == 'text/html' # Typically Flask returns text/html for simple strings
+    assert rv.mimetype == 'text/plain'
 
 def test_status_endpoint(client):
     """
@@ -67,7 +75,29 @@ def test_status_endpoint(client):
     rv = client.get('/status') # Make a GET request to the /status URL
     assert rv.status_code == 200 # Assert HTTP 200 OK
     assert b'OK' in rv.data
-    assert rv.mimetype == 'text/html'
+    assert rv.mimetype == 'text/plain'
+
+def test_status_endpoint_trailing_slash(client):
+    """
+    Tests that '/status/' is served directly (strict_slashes is disabled),
+    since some health checkers append a trailing slash.
+    """
+    rv = client.get('/status/')
+    assert rv.status_code == 200 # Not a 404 or a redirect
+    assert rv.data == b'OK'
+
+def test_shared_responses_unchanged_by_compression(client, _shared_response_headers):
+    """
+    Tests that serving / and /status to a gzip-capable client leaves the shared
+    pre-built Response objects untouched (Flask-Compress must not write to them).
+    """
+    for url in ('/', '/status'):
+        rv = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert rv.status_code == 200
+        assert 'Content-Encoding' not in rv.headers
+
+    for response, headers_at_import in _shared_response_headers:
+        assert list(response.headers) == headers_at_import
 
 def test_health_endpoint_success(client):
     """
@@ -78,7 +108,7 @@ def test_health_endpoint_success(client):
     assert rv.status_code == 200 # Assert HTTP 200 OK
     assert rv.mimetype == 'application/json' # Assert response is JSON
 
-    data = json.loads(rv.data) # Parse the JSON response
+    data = rv.get_json() # Parse the JSON response (parsed once, then memoized)
 
     # Assert basic structure and expected values
     assert isinstance(data, dict)
@@ -92,8 +122,67 @@ def test_health_endpoint_success(client):
     assert data['application_version'] == 'test-version-1.0.0'
     assert data['environment'] == 'testing' # Confirm it picked up the testing environment
     assert isinstance(data['timestamp'], str) # Check if timestamp is a string
+    timestamp = datetime.fromisoformat(data['timestamp'])
+    assert timestamp.utcoffset() == timedelta(0) # UTC, with an explicit +00:00 offset
+    assert timestamp.microsecond == 0 # Whole-second resolution (payload is cached per second)
     assert isinstance(data['checks'], list)
 
+def test_json_provider_matches_flask_defaults(client):
+    """
+    Tests that the orjson-backed JSON provider keeps the DefaultJSONProvider behaviours
+    the app relies on: sorted keys, non-str keys, Decimal and HTTP-date encoding, and
+    that it honours stdlib-only options.
+    """
+    json_provider = client.application.json
+    data = {'b': Decimal('1.5'), 'a': datetime(2020, 1, 1, tzinfo=timezone.utc)}
+    assert json_provider.dumps(data) == '{"a":"Wed, 01 Jan 2020 00:00:00 GMT","b":"1.5"}'
+    assert json_provider.dumps({1: 'a'}) == '{"1":"a"}'
+    # Options orjson can't honour fall back to the stdlib encoder instead of being ignored
+    assert json_provider.dumps({'x': '\u00e9'}, ensure_ascii=True) == '{"x": "\\u00e9"}'
+
+def test_log_handler_drops_records_when_queue_full(_app_env):
+    """
+    Tests that the app's queue handler drops records once its bounded queue is full,
+    instead of raising or blocking the request thread.
+    """
+    from app import _NonBlockingQueueHandler # Imported after _app_env, like the client fixture
+
+    log_queue = queue.Queue(maxsize=2)
+    handler = _NonBlockingQueueHandler(log_queue)
+    record = logging.makeLogRecord({'msg': 'test record', 'levelno': logging.INFO})
+
+    for _ in range(5):
+        handler.enqueue(record) # Would raise queue.Full if records weren't dropped
+
+    assert log_queue.qsize() == 2 # Only the first two records were kept
+
+def test_log_listener_stop_gives_up_on_stalled_sink(_app_env, monkeypatch):
+    """
+    Tests that stopping the log listener returns within the shutdown timeout when the
+    log sink has stalled and the queue is full, instead of blocking interpreter exit.
+    """
+    import app as app_module
+    monkeypatch.setattr(app_module, 'LOG_SHUTDOWN_TIMEOUT', 0.1)
+
+    unblock = threading.Event()
+    class StalledHandler(logging.Handler):
+        def emit(self, record):
+            unblock.wait() # Simulates a write that never completes
+
+    log_queue = queue.Queue(maxsize=1)
+    listener = app_module._BoundedQueueListener(log_queue, StalledHandler())
+    listener.start()
+    record = logging.makeLogRecord({'msg': 'test record', 'levelno': logging.INFO})
+    log_queue.put(record) # Picked up by the listener, which then blocks in emit()
+    log_queue.put(record) # Fills the queue, so the shutdown sentinel can't be enqueued
+
+    try:
+        started = time.monotonic()
+        assert listener.stop() is False # Listener could not drain the queue
+        assert time.monotonic() - started < 1
+    finally:
+        unblock.set() # Release the stalled handler so the thread can finish
+
 # Example of a test for degraded/down health (requires mocking dependencies)
 # For instance, if your /health endpoint checks a database, you would mock the
 # database connection to simulate a failure and then assert the 'DOWN' status.
@@ -107,7 +196,7 @@ def test_health_endpoint_success(client):
 #     mocker.patch('app.check_database_connection', return_value=(db_up, "Mocked DB status"))
 #
 #     rv = client.get('/health')
-#     data = json.loads(rv.data)
+#     data = rv.get_json()
 #
 #     assert data['status'] == expected_status
 #     if not db_up: